@@ -0,0 +1,42 @@
+import os
+from urllib.parse import quote
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+# Bounds how long another worker can keep a deleted group's pk when the cache is per-process
+GROUP_CACHE_TIMEOUT = 300
+
+
+def _front_office_group_name():
+    return os.environ.get('FRONT_OFFICE_GROUP_NAME', 'Front Office')
+
+
+def _cache_key(name):
+    # Group names may contain spaces, which memcached rejects in keys
+    return f"healthclub:group_pk:{quote(name)}"
+
+
+def front_office_group():
+    """The group granted view access on new reservations and invoices, or None if it does not exist."""
+    name = _front_office_group_name()
+    key = _cache_key(name)
+    pk = cache.get(key)
+    if pk is None:
+        # Misses are not cached, so a group created later is picked up on the next call
+        pk = Group.objects.filter(name=name).values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        cache.set(key, pk, GROUP_CACHE_TIMEOUT)
+    # Only the key is written by assign_perm, so an unsaved stand-in avoids re-reading the row
+    return Group(pk=pk, name=name)
+
+
+@receiver(post_save, sender=Group, dispatch_uid="healthclub.clear_group_cache_on_save")
+@receiver(post_delete, sender=Group, dispatch_uid="healthclub.clear_group_cache_on_delete")
+def clear_group_cache(sender, **kwargs):
+    # Renames change which row the configured name points at, so drop the entry on any write
+    cache.delete(_cache_key(_front_office_group_name()))
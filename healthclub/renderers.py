@@ -0,0 +1,24 @@
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class OrjsonRenderer(BaseRenderer):
+    """JSON renderer backed by orjson; values orjson cannot encode natively go through DRF's encoder."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    # Route datetimes and dataclasses through DRF too, so the output matches JSONRenderer
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    # Honour an "indent" media type parameter or renderer_context['indent'] as JSONRenderer does
+    get_indent = JSONRenderer.get_indent
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = self.options
+        # orjson only indents by two spaces, so any requested indent maps to that
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=JSONEncoder().default, option=options)
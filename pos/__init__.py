@@ -22,7 +22,11 @@ def create_invoice_for_reservation(reservation, include_deposit_as_line_item=Fal
     )
     
     # Add one item per reserved service; fallback to a generic line if none
-    reservation_services = list(reservation.reservation_services.select_related("service").all())
+    # Reuse services prefetched by the caller (batch invoicing) instead of querying again
+    if 'reservation_services' in getattr(reservation, '_prefetched_objects_cache', {}):
+        reservation_services = list(reservation.reservation_services.all())
+    else:
+        reservation_services = list(reservation.reservation_services.select_related("service").all())
     if reservation_services:
         for rs in reservation_services:
             service = rs.service
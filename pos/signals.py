@@ -1,6 +1,8 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from healthclub.groups import front_office_group
+
 from .models import Invoice
 
 
@@ -9,16 +11,11 @@ def grant_view_on_invoice(sender, instance: Invoice, created, **kwargs):
     if not created:
         return
     from guardian.shortcuts import assign_perm
-    from django.contrib.auth.models import Group
-    import os
 
     # Front Office group
-    group_name = os.environ.get('FRONT_OFFICE_GROUP_NAME', 'Front Office')
-    try:
-        front_office = Group.objects.get(name=group_name)
+    front_office = front_office_group()
+    if front_office is not None:
         assign_perm('pos.view_invoice', front_office, instance)
-    except Group.DoesNotExist:
-        pass
 
     # Assigned therapists on the reservation, if present
     reservation = instance.reservation
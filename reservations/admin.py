@@ -1,10 +1,15 @@
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.http import JsonResponse
 from django.urls import path
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
 
 from .models import Location, Reservation, ReservationService, LocationType, LocationStatus, HousekeepingTask
 from services.models import Service
@@ -48,6 +53,10 @@ class ReservationServiceInline(admin.TabularInline):
     extra = 1
     fields = ('service', 'service_details', 'quantity', 'unit_price', 'total_price_display')
     readonly_fields = ('service_details', 'total_price_display')
+
+    def get_queryset(self, request):
+        # service_details and the form's initial unit_price read obj.service on every row
+        return super().get_queryset(request).select_related('service')
     
     def service_details(self, obj):
         """Display service details"""
@@ -67,9 +76,9 @@ class ReservationServiceInline(admin.TabularInline):
     
     def total_price_display(self, obj):
         """Display calculated total price"""
-        if obj.unit_price and obj.quantity:
-            total = obj.unit_price * obj.quantity
-            return format_html('<strong>${:.2f}</strong>', total)
+        # total_price is computed by the database; unsaved inline rows do not have it yet
+        if obj.pk and obj.unit_price and obj.quantity:
+            return format_html('<strong>${}</strong>', f"{obj.total_price:.2f}")
         return "-"
     total_price_display.short_description = "Total Price"
     
@@ -105,6 +114,8 @@ class LocationStatusAdmin(admin.ModelAdmin):
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ("id", "guest", "location", "start_time", "end_time", "status", "total_duration", "total_price")
     list_filter = ("status", "location", "start_time")
+    # Skip the unfiltered COUNT(*) the changelist runs for "N total" on every filtered page
+    show_full_result_count = False
     search_fields = ("guest__first_name", "guest__last_name", "notes")
     inlines = [ReservationServiceInline]
     readonly_fields = ("checked_in_at", "in_service_at", "completed_at", "checked_out_at", "cancelled_at", "no_show_recorded_at")
@@ -137,55 +148,84 @@ class ReservationAdmin(admin.ModelAdmin):
         except Service.DoesNotExist:
             return JsonResponse({'error': 'Service not found'}, status=404)
     
+    def get_queryset(self, request):
+        # Aggregate per-reservation totals in SQL instead of walking services per row
+        return super().get_queryset(request).annotate(
+            _total_duration=Coalesce(Sum('reservation_services__service__duration_minutes'), 0),
+            _total_price=Coalesce(Sum('reservation_services__total_price'), Decimal('0.00')),
+        )
+
     def total_duration(self, obj):
         """Calculate total duration from all services"""
-        total = 0
-        for service in obj.reservation_services.all():
-            total += service.service_duration_minutes
-        return f"{total} min"
+        return f"{obj._total_duration} min"
     total_duration.short_description = "Total Duration"
+    total_duration.admin_order_field = "_total_duration"
     
     def total_price(self, obj):
         """Calculate total price from all services"""
-        total = 0
-        for service in obj.reservation_services.all():
-            total += service.total_price
-        return f"${total:.2f}"
+        return f"${obj._total_price:.2f}"
     total_price.short_description = "Total Price"
+    total_price.admin_order_field = "_total_price"
+
+    def _update_status(self, request, queryset, status, timestamp_field):
+        """Set status and its timestamp in one UPDATE, keeping timestamps already recorded.
+
+        Returns None, after reporting the error, when the update would make two active
+        reservations overlap in the same room.
+        """
+        try:
+            with transaction.atomic():
+                return queryset.update(**{
+                    'status': status,
+                    timestamp_field: Coalesce(F(timestamp_field), Value(timezone.now())),
+                })
+        except IntegrityError:
+            self.message_user(
+                request,
+                "No reservations were updated: the change would overlap another active reservation in the same room.",
+                messages.ERROR,
+            )
+            return None
 
     @admin.action(description="Check in selected reservations")
     def action_check_in(self, request, queryset):
-        updated = queryset.update(status=Reservation.STATUS_CHECKED_IN)
-        self.message_user(request, f"Checked in {updated} reservations.", messages.SUCCESS)
+        updated = self._update_status(request, queryset, Reservation.STATUS_CHECKED_IN, 'checked_in_at')
+        if updated is not None:
+            self.message_user(request, f"Checked in {updated} reservations.", messages.SUCCESS)
 
     @admin.action(description="Mark selected as In Service")
     def action_mark_in_service(self, request, queryset):
-        updated = queryset.update(status=Reservation.STATUS_IN_SERVICE)
-        self.message_user(request, f"Marked {updated} reservations as In Service.", messages.SUCCESS)
+        updated = self._update_status(request, queryset, Reservation.STATUS_IN_SERVICE, 'in_service_at')
+        if updated is not None:
+            self.message_user(request, f"Marked {updated} reservations as In Service.", messages.SUCCESS)
 
     @admin.action(description="Complete selected reservations")
     def action_complete(self, request, queryset):
-        updated = queryset.update(status=Reservation.STATUS_COMPLETED)
-        self.message_user(request, f"Completed {updated} reservations.", messages.SUCCESS)
+        updated = self._update_status(request, queryset, Reservation.STATUS_COMPLETED, 'completed_at')
+        if updated is not None:
+            self.message_user(request, f"Completed {updated} reservations.", messages.SUCCESS)
 
     @admin.action(description="Check out selected reservations")
     def action_check_out(self, request, queryset):
-        updated = queryset.update(status=Reservation.STATUS_CHECKED_OUT)
-        self.message_user(request, f"Checked out {updated} reservations.", messages.SUCCESS)
+        updated = self._update_status(request, queryset, Reservation.STATUS_CHECKED_OUT, 'checked_out_at')
+        if updated is not None:
+            self.message_user(request, f"Checked out {updated} reservations.", messages.SUCCESS)
 
     @admin.action(description="Create invoice for selected reservations")
     def action_create_invoice(self, request, queryset):
         created = 0
-        for reservation in queryset:
-            create_invoice_for_reservation(reservation)
-            created += 1
+        reservations = queryset.select_related('guest').prefetch_related('reservation_services__service')
+        with transaction.atomic():
+            for reservation in reservations:
+                create_invoice_for_reservation(reservation)
+                created += 1
         self.message_user(request, f"Created {created} invoices.", messages.SUCCESS)
 
 
 @admin.register(ReservationService)
 class ReservationServiceAdmin(admin.ModelAdmin):
     form = ReservationServiceForm
-    list_display = ("reservation", "service", "service_price", "quantity", "unit_price", "total_price")
+    list_display = ("reservation", "service", "service_price", "quantity", "unit_price", "total_price_display")
     list_select_related = ("reservation", "service")
     list_filter = ("service", "reservation__status")
     search_fields = ("reservation__guest__first_name", "reservation__guest__last_name", "service__name")
@@ -200,13 +240,14 @@ class ReservationServiceAdmin(admin.ModelAdmin):
         return "-"
     service_price.short_description = "Service Price"
     
-    def total_price(self, obj):
+    def total_price_display(self, obj):
         """Display calculated total price"""
-        if obj.unit_price and obj.quantity:
-            total = obj.unit_price * obj.quantity
-            return f"${total:.2f}"
+        # total_price is computed by the database; unsaved rows do not have it yet
+        if obj.pk and obj.unit_price and obj.quantity:
+            return f"${obj.total_price:.2f}"
         return "-"
-    total_price.short_description = "Total Price"
+    total_price_display.short_description = "Total Price"
+    total_price_display.admin_order_field = "total_price"
 
 
 @admin.register(HousekeepingTask)
@@ -1,12 +1,24 @@
 from django.core.management.base import BaseCommand
-from django.contrib.auth.models import Group
-from guardian.shortcuts import assign_perm
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from guardian.models import GroupObjectPermission, UserObjectPermission
 import os
 
 
+BATCH_SIZE = 1000
+
+
 class Command(BaseCommand):
     help = "Backfill object permissions for reservations and invoices"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sql-fast',
+            action='store_true',
+            help='Seed permissions with INSERT ... SELECT statements executed entirely in the database',
+        )
+
     def handle(self, *args, **options):
         from reservations.models import Reservation
         from pos.models import Invoice
@@ -18,29 +30,120 @@ class Command(BaseCommand):
         except Group.DoesNotExist:
             self.stdout.write(self.style.WARNING(f"Group '{group_name}' not found; skipping group grants"))
 
+        res_ct = ContentType.objects.get_for_model(Reservation)
+        inv_ct = ContentType.objects.get_for_model(Invoice)
+        view_res = Permission.objects.get(content_type=res_ct, codename='view_reservation')
+        change_res = Permission.objects.get(content_type=res_ct, codename='change_reservation')
+        view_inv = Permission.objects.get(content_type=inv_ct, codename='view_invoice')
+
+        if options.get('sql_fast'):
+            self._backfill_sql(group, res_ct, inv_ct, view_res, change_res, view_inv)
+            return
+
+        # Only primary keys and assigned user ids are needed, so read plain tuples
+        # (one row per object/assignee pair) instead of hydrating model instances.
         # Reservations: grant to Front Office and to assigned therapists
-        qs_res = Reservation.objects.all()
-        count_res = 0
-        for res in qs_res.iterator():
-            if group:
-                assign_perm('reservations.view_reservation', group, res)
-            for assignment in res.employee_assignments.select_related('employee__user').all():
-                user = assignment.employee.user
-                assign_perm('reservations.view_reservation', user, res)
-                assign_perm('reservations.change_reservation', user, res)
-            count_res += 1
+        rows_res = Reservation.objects.values_list(
+            'pk', 'employee_assignments__employee__user_id'
+        ).order_by('pk').distinct()
+        count_res, attempted_res = self._grant_rows(rows_res, res_ct, group, view_res, (view_res, change_res))
         self.stdout.write(self.style.SUCCESS(f"Processed reservations: {count_res}"))
 
         # Invoices: grant to Front Office and assigned therapists
-        qs_inv = Invoice.objects.select_related('reservation').all()
-        count_inv = 0
-        for inv in qs_inv.iterator():
-            if group:
-                assign_perm('pos.view_invoice', group, inv)
-            if inv.reservation:
-                for assignment in inv.reservation.employee_assignments.select_related('employee__user').all():
-                    user = assignment.employee.user
-                    assign_perm('pos.view_invoice', user, inv)
-            count_inv += 1
+        rows_inv = Invoice.objects.values_list(
+            'pk', 'reservation__employee_assignments__employee__user_id'
+        ).order_by('pk').distinct()
+        count_inv, attempted_inv = self._grant_rows(rows_inv, inv_ct, group, view_inv, (view_inv,))
         self.stdout.write(self.style.SUCCESS(f"Processed invoices: {count_inv}"))
 
+        # Rows that already existed are skipped by the unique constraint, so this is an upper bound
+        self.stdout.write(self.style.SUCCESS(
+            f"Attempted {attempted_res + attempted_inv} object permission grants"
+        ))
+
+    def _grant_rows(self, rows, content_type, group, group_perm, user_perms):
+        """Stream (pk, user_id) rows ordered by pk and insert their grants BATCH_SIZE rows at a time.
+
+        Returns the number of objects seen and the number of permission rows attempted.
+        """
+        user_rows = []
+        group_rows = []
+        count = 0
+        attempted = 0
+        last_pk = None
+        for obj_pk, user_id in rows.iterator(chunk_size=BATCH_SIZE):
+            object_pk = str(obj_pk)
+            # Rows are ordered by pk, so a new pk marks the first row for that object
+            if obj_pk != last_pk:
+                last_pk = obj_pk
+                count += 1
+                if group:
+                    group_rows.append(GroupObjectPermission(
+                        group=group, permission=group_perm, content_type=content_type, object_pk=object_pk
+                    ))
+            if user_id:
+                for perm in user_perms:
+                    user_rows.append(UserObjectPermission(
+                        user_id=user_id, permission=perm, content_type=content_type, object_pk=object_pk
+                    ))
+            if len(user_rows) + len(group_rows) >= BATCH_SIZE:
+                attempted += self._flush(user_rows, group_rows)
+        attempted += self._flush(user_rows, group_rows)
+        return count, attempted
+
+    def _flush(self, user_rows, group_rows):
+        """Insert and clear the pending rows; existing grants are skipped by the unique constraint."""
+        GroupObjectPermission.objects.bulk_create(group_rows, ignore_conflicts=True)
+        UserObjectPermission.objects.bulk_create(user_rows, ignore_conflicts=True)
+        flushed = len(user_rows) + len(group_rows)
+        user_rows.clear()
+        group_rows.clear()
+        return flushed
+
+    def _backfill_sql(self, group, res_ct, inv_ct, view_res, change_res, view_inv):
+        """Insert the same grants as handle() with set-based INSERT ... SELECT statements."""
+        from reservations.models import Reservation
+        from pos.models import Invoice
+        from employees.models import Employee, ReservationEmployeeAssignment
+
+        user_table = UserObjectPermission._meta.db_table
+        group_table = GroupObjectPermission._meta.db_table
+        reservation_table = Reservation._meta.db_table
+        invoice_table = Invoice._meta.db_table
+        assignment_table = ReservationEmployeeAssignment._meta.db_table
+        employee_table = Employee._meta.db_table
+
+        # "WHERE 1 = 1" keeps SQLite from parsing ON CONFLICT as part of the SELECT
+        user_grants_sql = (
+            f"INSERT INTO {user_table} (object_pk, content_type_id, permission_id, user_id) "
+            f"SELECT DISTINCT CAST(a.reservation_id AS VARCHAR(255)), %s, %s, e.user_id "
+            f"FROM {assignment_table} a JOIN {employee_table} e ON e.id = a.employee_id "
+            f"WHERE 1 = 1 ON CONFLICT DO NOTHING"
+        )
+        invoice_user_grants_sql = (
+            f"INSERT INTO {user_table} (object_pk, content_type_id, permission_id, user_id) "
+            f"SELECT DISTINCT CAST(i.id AS VARCHAR(255)), %s, %s, e.user_id "
+            f"FROM {invoice_table} i "
+            f"JOIN {assignment_table} a ON a.reservation_id = i.reservation_id "
+            f"JOIN {employee_table} e ON e.id = a.employee_id "
+            f"WHERE 1 = 1 ON CONFLICT DO NOTHING"
+        )
+        group_grants_sql = (
+            f"INSERT INTO {group_table} (object_pk, content_type_id, permission_id, group_id) "
+            f"SELECT CAST(o.id AS VARCHAR(255)), %s, %s, %s FROM {{table}} o "
+            f"WHERE 1 = 1 ON CONFLICT DO NOTHING"
+        )
+
+        inserted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for perm in (view_res, change_res):
+                cursor.execute(user_grants_sql, [res_ct.id, perm.id])
+                inserted += max(cursor.rowcount, 0)
+            cursor.execute(invoice_user_grants_sql, [inv_ct.id, view_inv.id])
+            inserted += max(cursor.rowcount, 0)
+            if group:
+                cursor.execute(group_grants_sql.format(table=reservation_table), [res_ct.id, view_res.id, group.id])
+                inserted += max(cursor.rowcount, 0)
+                cursor.execute(group_grants_sql.format(table=invoice_table), [inv_ct.id, view_inv.id, group.id])
+                inserted += max(cursor.rowcount, 0)
+        self.stdout.write(self.style.SUCCESS(f"Inserted {inserted} object permissions"))
@@ -1,7 +1,29 @@
+from contextlib import contextmanager
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from reservations.models import Reservation
 from pos import create_invoice_for_reservation
+from pos.models import Deposit, Invoice, InvoiceItem, Payment
+
+
+BATCH_SIZE = 500
+
+
+@contextmanager
+def history_disabled():
+    """Temporarily stop django-simple-history from writing a row on every save.
+
+    Only safe in single-threaded code such as this command, since it flips a global setting.
+    """
+    previous = getattr(settings, 'SIMPLE_HISTORY_ENABLED', True)
+    settings.SIMPLE_HISTORY_ENABLED = False
+    try:
+        yield
+    finally:
+        settings.SIMPLE_HISTORY_ENABLED = previous
 
 
 class Command(BaseCommand):
@@ -17,22 +39,22 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         
-        # Find reservations without invoices
+        # Find reservations without invoices (anti-join, no DISTINCT needed)
         reservations_without_invoices = Reservation.objects.filter(
-            invoices__isnull=True
-        ).distinct()
-        
-        count = reservations_without_invoices.count()
+            ~Exists(Invoice.objects.filter(reservation=OuterRef('pk')))
+        ).select_related('guest').only(
+            'id', 'status', 'deposit_required', 'deposit_amount', 'guest'
+        ).order_by('id')
         
-        if count == 0:
+        if not reservations_without_invoices.exists():
             self.stdout.write(
                 self.style.SUCCESS('All reservations already have invoices!')
             )
             return
         
-        self.stdout.write(f'Found {count} reservations without invoices')
-        
         if dry_run:
+            count = reservations_without_invoices.count()
+            self.stdout.write(f'Found {count} reservations without invoices')
             self.stdout.write('DRY RUN - No invoices will be created')
             for reservation in reservations_without_invoices[:10]:  # Show first 10
                 self.stdout.write(f'  - Reservation #{reservation.id} for {reservation.guest}')
@@ -43,22 +65,71 @@ class Command(BaseCommand):
         created = 0
         failed = 0
         
-        for reservation in reservations_without_invoices:
-            try:
-                with transaction.atomic():
-                    include_deposit = reservation.deposit_required and reservation.deposit_amount
-                    invoice = create_invoice_for_reservation(
-                        reservation, 
-                        include_deposit_as_line_item=include_deposit
-                    )
-                    created += 1
-                    self.stdout.write(f'Created invoice for Reservation #{reservation.id}')
-            except Exception as e:
-                failed += 1
-                self.stdout.write(
-                    self.style.ERROR(f'Failed to create invoice for Reservation #{reservation.id}: {e}')
-                )
+        # One transaction per batch; each reservation gets its own savepoint so a
+        # single failure does not roll back the rest of the batch
+        for batch in self._batches(reservations_without_invoices, BATCH_SIZE):
+            with transaction.atomic():
+                invoices = []
+                # Every item save re-saves the invoice via recalculate_totals(), so history is
+                # written once per created row after the batch instead of on each save
+                with history_disabled():
+                    for reservation in batch:
+                        try:
+                            with transaction.atomic():
+                                include_deposit = reservation.deposit_required and reservation.deposit_amount
+                                invoice = create_invoice_for_reservation(
+                                    reservation, 
+                                    include_deposit_as_line_item=include_deposit
+                                )
+                            invoices.append(invoice)
+                            created += 1
+                            self.stdout.write(f'Created invoice for Reservation #{reservation.id}')
+                        except Exception as e:
+                            failed += 1
+                            self.stdout.write(
+                                self.style.ERROR(f'Failed to create invoice for Reservation #{reservation.id}: {e}')
+                            )
+                self._record_history(invoices)
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {created} invoices. {failed} failed.')
         )
+
+    @staticmethod
+    def _batches(queryset, size):
+        """Yield lists of at most ``size`` objects while streaming the queryset."""
+        batch = []
+        for obj in queryset.iterator(chunk_size=size):
+            batch.append(obj)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _record_history(invoices):
+        """Write a single history snapshot for the rows created for ``invoices``."""
+        if not invoices:
+            return
+        invoice_ids = [invoice.pk for invoice in invoices]
+        Invoice.history.bulk_history_create(
+            list(Invoice.objects.filter(pk__in=invoice_ids)), batch_size=BATCH_SIZE
+        )
+        InvoiceItem.history.bulk_history_create(
+            list(InvoiceItem.objects.filter(invoice_id__in=invoice_ids)), batch_size=BATCH_SIZE
+        )
+        payments = list(Payment.objects.filter(invoice_id__in=invoice_ids))
+        Payment.history.bulk_history_create(payments, batch_size=BATCH_SIZE)
+        # Only deposits applied to these invoices changed; Deposit.apply_to_invoice records
+        # each application as a payment referencing "Deposit #<id>"
+        deposit_ids = {
+            int(payment.reference.rsplit('#', 1)[1])
+            for payment in payments
+            if payment.payment_type == 'deposit_application' and '#' in (payment.reference or '')
+        }
+        if deposit_ids:
+            # Deposits already existed; applying them to the new invoices is an update
+            Deposit.history.bulk_history_create(
+                list(Deposit.objects.filter(pk__in=deposit_ids)), batch_size=BATCH_SIZE, update=True
+            )
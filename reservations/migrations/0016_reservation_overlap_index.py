@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-16 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0015_add_deposit_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["location", "status", "start_time"],
+                name="res_loc_status_start_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-16 17:48
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0016_reservation_overlap_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservationservice",
+            name="total_price",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    django.db.models.functions.comparison.Coalesce(
+                        models.F("unit_price"), models.Value(Decimal("0.00"))
+                    ),
+                    "*",
+                    models.F("quantity"),
+                ),
+                output_field=models.DecimalField(decimal_places=2, max_digits=12),
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-16 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0017_reservationservice_total_price"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_active", True),
+                    ("is_clean", True),
+                    ("is_occupied", False),
+                    ("is_out_of_service", False),
+                ),
+                fields=["name"],
+                name="loc_available_idx",
+            ),
+        ),
+    ]
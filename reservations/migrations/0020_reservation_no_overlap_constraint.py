@@ -0,0 +1,72 @@
+from django.db import migrations
+
+
+# PostgreSQL only: btree_gist lets the integer location_id share a GiST index with the time range
+CREATE_CONSTRAINT = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist;",
+    """
+    ALTER TABLE reservations_reservation
+    ADD CONSTRAINT reservation_no_overlap
+    EXCLUDE USING gist (
+        location_id WITH =,
+        tstzrange(start_time, end_time, '[)') WITH &&
+    )
+    WHERE (status IN ('booked', 'checked_in', 'in_service'));
+    """,
+]
+DROP_CONSTRAINT = [
+    "ALTER TABLE reservations_reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap;",
+]
+
+
+# Same predicate as the constraint: shared room, half-open ranges that intersect, both rows active
+FIND_OVERLAPS = """
+    SELECT a.id, b.id, a.location_id
+    FROM reservations_reservation a
+    JOIN reservations_reservation b
+      ON b.location_id = a.location_id
+     AND b.id > a.id
+     AND b.start_time < a.end_time
+     AND b.end_time > a.start_time
+    WHERE a.status IN ('booked', 'checked_in', 'in_service')
+      AND b.status IN ('booked', 'checked_in', 'in_service')
+    ORDER BY a.id, b.id
+    LIMIT 50
+"""
+
+
+def add_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Bulk admin status updates bypass clean(), so existing rows may already overlap
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(FIND_OVERLAPS)
+        overlaps = cursor.fetchall()
+    if overlaps:
+        pairs = "\n".join(
+            f"  reservation {a} and {b} (location {loc})" for a, b, loc in overlaps
+        )
+        raise RuntimeError(
+            "Cannot add reservation_no_overlap: these active reservations overlap in the same room "
+            "(first 50 shown). Cancel or move them, then re-run the migration.\n" + pairs
+        )
+    for sql in CREATE_CONSTRAINT:
+        schema_editor.execute(sql)
+
+
+def drop_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_CONSTRAINT:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0019_location_available_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraint, drop_constraint),
+    ]
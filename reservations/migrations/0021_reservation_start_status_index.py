@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-16 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0020_reservation_no_overlap_constraint"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["start_time", "status"], name="res_start_status_idx"
+            ),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from simple_history.models import HistoricalRecords
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 
 
 class LocationType(models.Model):
@@ -64,6 +66,14 @@ class Location(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Bookable rooms, scanned in name order when a reservation is auto-assigned a room
+            models.Index(
+                fields=['name'],
+                condition=models.Q(is_active=True, is_out_of_service=False, is_clean=True, is_occupied=False),
+                name='loc_available_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -112,6 +122,9 @@ class Reservation(models.Model):
         (STATUS_CHECKED_OUT, "Checked out"),
     )
 
+    # Statuses that hold a room; overlapping reservations in these statuses conflict
+    ACTIVE_STATUSES = (STATUS_BOOKED, STATUS_CHECKED_IN, STATUS_IN_SERVICE)
+
     guest = models.ForeignKey(
         'guests.Guest',
         on_delete=models.CASCADE,
@@ -194,6 +207,12 @@ class Reservation(models.Model):
                 name='reservation_time_valid_range',
             )
         ]
+        indexes = [
+            # Covers the room overlap check in clean() and the conflict-check endpoints
+            models.Index(fields=['location', 'status', 'start_time'], name='res_loc_status_start_idx'),
+            # Date-range filters and the default -start_time ordering of the calendar/list views
+            models.Index(fields=['start_time', 'status'], name='res_start_status_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Reservation #{self.pk or 'new'} for {self.guest} at {self.start_time}"
@@ -225,6 +244,15 @@ class Reservation(models.Model):
             return True
         return False
 
+    @classmethod
+    def overlap_q(cls, start_time, end_time):
+        """Q matching active reservations whose time range overlaps [start_time, end_time)"""
+        return models.Q(
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+            status__in=cls.ACTIVE_STATUSES,
+        )
+
     def clean(self) -> None:
         # 1. Prevent past reservations - but allow status updates for existing reservations
         if not self.pk and self.start_time < timezone.now():
@@ -239,10 +267,8 @@ class Reservation(models.Model):
         # Check for booking conflicts only when we have a location and both times
         if self.location_id and self.start_time and self.end_time:
             qs = Reservation.objects.filter(
+                self.overlap_q(self.start_time, self.end_time),
                 location_id=self.location_id,
-                start_time__lt=self.end_time,
-                end_time__gt=self.start_time,
-                status__in=[self.STATUS_BOOKED, self.STATUS_CHECKED_IN, self.STATUS_IN_SERVICE]
             )
             if self.pk:
                 qs = qs.exclude(pk=self.pk)
@@ -256,11 +282,12 @@ class Reservation(models.Model):
         # Accessing reverse relation requires a primary key
         if getattr(self, 'pk', None) and self.start_time:
             try:
-                if self.reservation_services.exists():
-                    total_minutes = sum(
-                        s.service.duration_minutes * s.quantity
-                        for s in self.reservation_services.all()
-                    )
+                # One query for all (duration, quantity) pairs instead of exists() + a row per service
+                durations = list(
+                    self.reservation_services.values_list('service__duration_minutes', 'quantity')
+                )
+                if durations:
+                    total_minutes = sum(duration * quantity for duration, quantity in durations)
                     self.end_time = self.start_time + timedelta(minutes=total_minutes)
             except Exception:
                 pass
@@ -268,6 +295,24 @@ class Reservation(models.Model):
         # Run model validation consistently before save
         self.full_clean()
         super().save(*args, **kwargs)
+        # A partial save that leaves out status did not store it; keep the old value so the
+        # next full save still sees the transition
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'status' in update_fields:
+            self._loaded_status = self.status
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so the pre_save signal can spot transitions without a query
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
 
 def mark_guest_in_house(guest):
     """Mark guest as in house"""
@@ -294,6 +339,12 @@ class ReservationService(models.Model):
     )
     quantity = models.PositiveIntegerField(default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Stored by the database as unit_price * quantity so totals can be aggregated in SQL
+    total_price = models.GeneratedField(
+        expression=Coalesce(models.F('unit_price'), models.Value(Decimal('0.00'))) * models.F('quantity'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
     
     class Meta:
         unique_together = ('reservation', 'service')
@@ -309,14 +360,12 @@ class ReservationService(models.Model):
         if not self.unit_price and getattr(self, 'service_id', None):
             # Accessing self.service is safe here since service_id exists
             self.unit_price = getattr(self.service, 'price', self.unit_price)
+        adding = self._state.adding
         super().save(*args, **kwargs)
-
-    @property
-    def total_price(self):
-        """Calculate total price for this service (unit_price * quantity)"""
-        if self.unit_price:
-            return self.unit_price * self.quantity
-        return 0
+        # Inserts return the generated total; an UPDATE leaves the in-memory value stale
+        update_fields = kwargs.get('update_fields')
+        if not adding and (update_fields is None or {'unit_price', 'quantity'} & set(update_fields)):
+            self.refresh_from_db(fields=['total_price'])
 
     @property
     def service_duration_minutes(self):
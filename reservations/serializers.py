@@ -1,25 +1,54 @@
+import copy
+import logging
+
 from rest_framework import serializers
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Exists, OuterRef, Prefetch, Subquery, Sum, Value, When, prefetch_related_objects
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
 from .models import Location, Reservation, ReservationService, LocationType, LocationStatus, HousekeepingTask
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from functools import cached_property, partial
 from config.models import SystemConfiguration
-from django.core.exceptions import ValidationError as DjangoValidationError
-from employees.models import Employee
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.utils import timezone
+from employees.models import Employee, EmployeeWeeklySchedule, ReservationEmployeeAssignment
+from services.models import Service
+
+
+logger = logging.getLogger(__name__)
+
 
+class CachedFieldsMixin:
+    """Build a ModelSerializer's fields once per class and give each instance fresh copies.
 
-class LocationTypeSerializer(serializers.ModelSerializer):
+    ModelSerializer.get_fields() re-introspects the model on every instantiation,
+    which nested many=True serializers repeat for each parent. The copies are made
+    with deepcopy, the same cloning DRF applies to declared fields, so bound
+    fields and nested serializers are never shared between instances.
+    """
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = self.__class__
+        if cls not in CachedFieldsMixin._fields_cache:
+            CachedFieldsMixin._fields_cache[cls] = super().get_fields()
+        return copy.deepcopy(CachedFieldsMixin._fields_cache[cls])
+
+
+class LocationTypeSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = LocationType
         fields = ["id", "name", "description", "is_active"]
 
 
-class LocationStatusSerializer(serializers.ModelSerializer):
+class LocationStatusSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = LocationStatus
         fields = ["id", "name", "description", "is_active"]
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     type = LocationTypeSerializer(read_only=True)
     status = LocationStatusSerializer(read_only=True)
     type_id = serializers.PrimaryKeyRelatedField(queryset=LocationType.objects.all(), source='type', write_only=True, required=False, allow_null=True)
@@ -43,13 +72,29 @@ class ServiceDetailSerializer(serializers.Serializer):
     category = serializers.CharField(source='category.name', read_only=True)
 
 
-class ReservationServiceSerializer(serializers.ModelSerializer):
+class MembershipTierSummarySerializer(serializers.Serializer):
+    """Nested serializer for the guest's membership tier in ReservationSerializer"""
+    name = serializers.CharField()
+    display_name = serializers.CharField()
+
+
+class ReservationServiceListSerializer(serializers.ListSerializer):
+    """Load the services and categories of all rows together; already-joined rows cost no queries."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prefetch_related_objects(items, 'service__category')
+        return super().to_representation(items)
+
+
+class ReservationServiceSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     service_details = ServiceDetailSerializer(source='service', read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     service_duration_minutes = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = ReservationService
+        list_serializer_class = ReservationServiceListSerializer
         fields = [
             "id", 
             "service", 
@@ -69,16 +114,19 @@ class ReservationServiceSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class ReservationSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     reservation_services = ReservationServiceSerializer(many=True, required=False)
     guest_name = serializers.CharField(source='guest.full_name', read_only=True)
     location_name = serializers.CharField(source='location.name', read_only=True)
     employee = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all(), required=False, allow_null=True)
-    employee_name = serializers.SerializerMethodField()
-    total_duration_minutes = serializers.SerializerMethodField()
-    total_price = serializers.SerializerMethodField()
+    # Annotated by setup_eager_loading
+    employee_name = serializers.CharField(source='_employee_name', read_only=True)
+    total_duration_minutes = serializers.IntegerField(source='_total_duration', read_only=True)
+    total_price = serializers.DecimalField(
+        source='_total_price', max_digits=12, decimal_places=2, coerce_to_string=False, read_only=True
+    )
     location_is_out_of_service = serializers.BooleanField(source='location.is_out_of_service', read_only=True)
-    guest_membership_tier = serializers.SerializerMethodField()
+    guest_membership_tier = MembershipTierSummarySerializer(source='guest.membership_tier', read_only=True)
     guest_loyalty_points = serializers.IntegerField(source='guest.loyalty_points', read_only=True)
     cancellation_reason_name = serializers.CharField(source='cancellation_reason.name', read_only=True)
     deposit_status = serializers.CharField(read_only=True)
@@ -133,27 +181,116 @@ class ReservationSerializer(serializers.ModelSerializer):
             "can_pay_deposit",
         ]
 
-    def _compute_end_time(self, start_time, services_data):
-        """Compute end_time from service durations or default config."""
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join, prefetch and annotate everything this serializer reads, so lists need a fixed number of queries"""
+        return cls._annotate_totals(queryset).annotate(
+            _employee_name=cls._employee_name_expression(),
+        ).select_related(
+            'guest__membership_tier',
+            'location',
+            'cancellation_reason',
+        ).prefetch_related(
+            Prefetch(
+                'reservation_services',
+                queryset=ReservationService.objects.select_related('service__category'),
+            ),
+        )
+
+    @staticmethod
+    def _annotate_totals(queryset):
+        """Annotate the summed duration and price of each reservation's services."""
+        # Correlated subqueries keep the sums correct when a filter on
+        # reservation_services adds its own join to the outer query
+        services = ReservationService.objects.filter(reservation=OuterRef('pk')).order_by().values('reservation')
+        return queryset.annotate(
+            _total_duration=Coalesce(
+                Subquery(services.annotate(total=Sum('service__duration_minutes')).values('total')),
+                0,
+            ),
+            _total_price=Coalesce(
+                Subquery(services.annotate(total=Sum('total_price')).values('total')),
+                Value(Decimal('0.00')),
+            ),
+        )
+
+    @staticmethod
+    def _employee_name_expression():
+        """SQL for the employee display name, or NULL when it is blank.
+
+        The explicit employee wins; otherwise the Primary Therapist assignment, then the earliest one.
+        """
+        assigned_name = ReservationEmployeeAssignment.objects.filter(
+            reservation=OuterRef('pk'),
+        ).order_by(
+            Case(When(role_in_service='Primary Therapist', then=Value(0)), default=Value(1)),
+            'id',
+        ).annotate(
+            name=Concat('employee__user__first_name', Value(' '), 'employee__user__last_name'),
+        ).values('name')[:1]
+        name = Case(
+            When(
+                employee__isnull=False,
+                then=Concat('employee__user__first_name', Value(' '), 'employee__user__last_name'),
+            ),
+            default=Subquery(assigned_name),
+        )
+        return NullIf(Trim(name), Value(''))
+
+    @staticmethod
+    def _to_utc(value):
+        """Return the datetime as aware UTC, reading naive values in the current timezone."""
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.get_current_timezone())
+        return value.astimezone(dt_timezone.utc)
+
+    @staticmethod
+    def _scan_services(services_data):
+        """Walk the services payload once, returning (total_minutes, service_ids)."""
+        services_data = services_data or []
+        # Validated services are Service instances; any bare ids are resolved in one query
+        bare_ids = [srv['service'] for srv in services_data if isinstance(srv.get('service'), int)]
+        durations = dict(
+            Service.objects.filter(pk__in=bare_ids).values_list('pk', 'duration_minutes')
+        ) if bare_ids else {}
         total_minutes = 0
-        if services_data:
-            for srv in services_data:
-                service = srv.get('service')
-                quantity = srv.get('quantity', 1) or 1
-                if service is not None:
-                    try:
-                        total_minutes += int(service.duration_minutes) * int(quantity)
-                    except Exception:
-                        pass
+        service_ids = []
+        for srv in services_data:
+            service = srv.get('service')
+            if service is None:
+                continue
+            if isinstance(service, int):
+                service_ids.append(service)
+                duration = durations.get(service)
+            else:
+                service_ids.append(service.pk)
+                duration = service.duration_minutes
+            try:
+                total_minutes += int(duration) * int(srv.get('quantity', 1) or 1)
+            except (TypeError, ValueError):
+                pass
+        return total_minutes, service_ids
+
+    def _compute_end_time(self, start_time, total_minutes):
+        """Compute end_time from the summed service durations or default config."""
         if total_minutes <= 0:
-            default_minutes = SystemConfiguration.get_value(
-                key='default_reservation_duration_minutes',
-                default=60,
-                data_type='integer',
-            )
-            total_minutes = int(default_minutes or 60)
+            total_minutes = self._default_duration_minutes
         return start_time + timedelta(minutes=total_minutes)
 
+    @cached_property
+    def _default_duration_minutes(self):
+        """Configured default reservation length, read once per serializer instance.
+
+        With many=True every item is handled by the same child serializer, so a
+        bulk create reads the setting once.
+        """
+        default_minutes = SystemConfiguration.get_value(
+            key='default_reservation_duration_minutes',
+            default=60,
+            data_type='integer',
+        )
+        return int(default_minutes or 60)
+
     def validate(self, attrs):
         start_time = attrs.get('start_time') or getattr(self.instance, 'start_time', None)
         end_time = attrs.get('end_time')
@@ -165,28 +302,18 @@ class ReservationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"start_time": "This field is required."})
 
         # Normalize datetimes to aware UTC to avoid past/future mismatches across timezones
-        try:
-            from django.utils import timezone
-            if start_time is not None:
-                if timezone.is_naive(start_time):
-                    start_time = timezone.make_aware(start_time, timezone.get_current_timezone())
-                start_time = start_time.astimezone(timezone.utc)
-                attrs['start_time'] = start_time
-            if end_time is not None:
-                if timezone.is_naive(end_time):
-                    end_time = timezone.make_aware(end_time, timezone.get_current_timezone())
-                end_time = end_time.astimezone(timezone.utc)
-                attrs['end_time'] = end_time
-            # Disallow creating/updating to a past start time
-            if start_time < timezone.now():
-                raise serializers.ValidationError({"start_time": "Cannot create a reservation in the past."})
-        except Exception:
-            # Fall back to existing model-level validation if anything goes wrong
-            pass
+        start_time = self._to_utc(start_time)
+        if 'start_time' in attrs:
+            attrs['start_time'] = start_time
+        if end_time is not None:
+            end_time = attrs['end_time'] = self._to_utc(end_time)
+        # Disallow creating a reservation in the past; existing ones stay editable (as in Reservation.clean())
+        if self.instance is None and start_time < timezone.now():
+            raise serializers.ValidationError({"start_time": "Cannot create a reservation in the past."})
 
         # Auto-compute end_time if missing
         if not end_time:
-            attrs['end_time'] = self._compute_end_time(start_time, services_data)
+            attrs['end_time'] = self._compute_end_time(start_time, self._scan_services(services_data)[0])
         else:
             # If provided but invalid, raise a clear error instead of DB IntegrityError
             if end_time <= start_time:
@@ -204,9 +331,6 @@ class ReservationSerializer(serializers.ModelSerializer):
         employee = attrs.get('employee')
         if employee and start_time:
             try:
-                from employees.models import EmployeeWeeklySchedule
-                from datetime import datetime
-                
                 # Get the day of week for the start time
                 start_date = start_time.date()
                 day_of_week = start_time.weekday()  # 0=Monday, 6=Sunday
@@ -244,199 +368,65 @@ class ReservationSerializer(serializers.ModelSerializer):
                 raise
             except Exception as e:
                 # If schedule check fails, log but don't block reservation
-                import logging
-                logger = logging.getLogger(__name__)
                 logger.warning(f"Failed to check employee schedule: {e}")
 
         # Gender constraint removed - allowing all guests to use any location
 
-        # If only location is being updated (PATCH), ensure the slot isn't conflicting
-        if self.instance and 'location' in self.initial_data and location and start_time:
-            try:
-                from .models import Reservation
-                overlapping = Reservation.objects.filter(
-                    location_id=getattr(location, 'id', None) or location,
-                    start_time__lt=end_time or getattr(self.instance, 'end_time', None) or start_time,
-                    end_time__gt=start_time,
-                    status__in=[
-                        Reservation.STATUS_BOOKED,
-                        Reservation.STATUS_CHECKED_IN,
-                        Reservation.STATUS_IN_SERVICE,
-                    ],
-                )
-                if getattr(self.instance, 'id', None):
-                    overlapping = overlapping.exclude(id=self.instance.id)
-                if overlapping.exists():
-                    raise serializers.ValidationError({
-                        "location": "Selected room conflicts with another reservation at this time."
-                    })
-            except Exception:
-                pass
+        # Room overlap is checked once, by Reservation.clean(), when the instance is saved
 
         return attrs
 
-    def get_employee(self, obj):
-        """Determine the reservation's employee.
-
-        Preference order:
-        1) Explicit reservation.employee_id if present (source of truth when set)
-        2) Primary Therapist assignment
-        3) Any existing assignment
-        """
-        try:
-            # 1) Prefer explicit FK on Reservation if present
-            explicit_employee_id = getattr(obj, 'employee_id', None)
-            if explicit_employee_id:
-                return explicit_employee_id
-
-            # 2) Primary assignment
-            assignment = obj.employee_assignments.filter(role_in_service='Primary Therapist').first()
-            if assignment:
-                return assignment.employee.id
-
-            # 3) Any assignment
-            any_assignment = obj.employee_assignments.first()
-            return any_assignment.employee.id if any_assignment else None
-        except Exception:
-            return None
-
-    def get_employee_name(self, obj):
-        """Resolve employee's display name using the same precedence as get_employee."""
-        try:
-            # 1) If explicit FK is set, use it
-            explicit_employee = getattr(obj, 'employee', None)
-            if explicit_employee:
-                first = getattr(getattr(explicit_employee, 'user', None), 'first_name', '') or ''
-                last = getattr(getattr(explicit_employee, 'user', None), 'last_name', '') or ''
-                full = f"{first} {last}".strip()
-                return full or None
-
-            # 2) Primary assignment
-            assignment = obj.employee_assignments.filter(role_in_service='Primary Therapist').first()
-            if assignment and getattr(assignment.employee, 'user', None):
-                first = getattr(assignment.employee.user, 'first_name', '') or ''
-                last = getattr(assignment.employee.user, 'last_name', '') or ''
-                full = f"{first} {last}".strip()
-                return full or None
-
-            # 3) Any assignment
-            any_assignment = obj.employee_assignments.first()
-            if any_assignment and getattr(any_assignment.employee, 'user', None):
-                first = getattr(any_assignment.employee.user, 'first_name', '') or ''
-                last = getattr(any_assignment.employee.user, 'last_name', '') or ''
-                full = f"{first} {last}".strip()
-                return full or None
-        except Exception:
-            pass
-        return None
-
-    def get_total_duration_minutes(self, obj):
-        """Calculate total duration from all services"""
-        total = 0
-        for service in obj.reservation_services.all():
-            total += service.service_duration_minutes
-        return total
-
-    def get_total_price(self, obj):
-        """Calculate total price from all services"""
-        total = 0
-        for service in obj.reservation_services.all():
-            total += service.total_price
-        return total
-
-    def get_guest_membership_tier(self, obj):
-        """Get guest's membership tier information"""
-        try:
-            guest = obj.guest
-            if hasattr(guest, 'membership_tier') and guest.membership_tier:
-                tier = guest.membership_tier
-                return {
-                    'name': tier.name,
-                    'display_name': tier.display_name
-                }
-        except Exception:
-            pass
-        return None
-
+    @transaction.atomic
     def create(self, validated_data):
         services_data = validated_data.pop("reservation_services", [])
+        total_minutes, service_ids = self._scan_services(services_data)
         # Compute end_time before saving, based on provided services payload
         if not validated_data.get('end_time') and validated_data.get('start_time'):
-            # Try to read durations directly from provided services_data to avoid touching reverse relation pre-save
-            total_minutes = 0
-            for srv in services_data:
-                try:
-                    service_obj = srv.get('service')
-                    duration = None
-                    if hasattr(service_obj, 'duration_minutes'):
-                        duration = int(service_obj.duration_minutes)
-                    elif isinstance(service_obj, int):
-                        from services.models import Service
-                        duration = int(Service.objects.get(pk=service_obj).duration_minutes)
-                    qty = int(srv.get('quantity') or 1)
-                    if duration:
-                        total_minutes += duration * qty
-                except Exception:
-                    pass
-            if total_minutes <= 0:
-                validated_data['end_time'] = self._compute_end_time(validated_data['start_time'], services_data)
-            else:
-                validated_data['end_time'] = validated_data['start_time'] + timedelta(minutes=total_minutes)
+            validated_data['end_time'] = self._compute_end_time(validated_data['start_time'], total_minutes)
         # Auto-assign a clean, vacant room if none provided
         if not validated_data.get('location'):
-            from .models import Location
             qs = Location.objects.filter(is_active=True, is_out_of_service=False, is_clean=True, is_occupied=False)
             # Gender matching removed - allowing any available location
             # If services are provided, prefer rooms linked to those services
-            service_ids = [s.get('service').id if hasattr(s.get('service'), 'id') else s.get('service') for s in services_data if s.get('service')]
             if service_ids:
-                # Only filter by services if such a relation exists
-                try:
-                    qs = qs.filter(services__in=service_ids).distinct()
-                except Exception:
-                    pass
-            loc = qs.order_by('name').first()
-            if loc:
-                validated_data['location'] = loc
+                # EXISTS avoids the join fan-out and the DISTINCT sort over it
+                qs = qs.filter(Exists(
+                    Service.locations.through.objects.filter(location_id=OuterRef('pk'), service_id__in=service_ids)
+                ))
+            # Only the key is needed; the response re-reads the reservation with its location
+            location_id = qs.order_by('name').values_list('pk', flat=True).first()
+            if location_id:
+                validated_data['location_id'] = location_id
+        self._lock_location(
+            validated_data['location'].pk if validated_data.get('location') else validated_data.get('location_id')
+        )
         try:
             reservation = Reservation.objects.create(**validated_data)
         except DjangoValidationError as e:
             # Convert model validation errors to DRF-friendly response
             detail = getattr(e, 'message_dict', None) or {'detail': e.messages if hasattr(e, 'messages') else str(e)}
             raise serializers.ValidationError(detail)
+        except IntegrityError as e:
+            raise self._integrity_error_detail(e)
         except Exception as e:
             raise serializers.ValidationError({'detail': str(e)})
         
         # Create reservation services first
-        for srv in services_data:
-            ReservationService.objects.create(reservation=reservation, **srv)
+        self._create_services(reservation, services_data)
         
-        # Auto-create invoice for ALL reservations (after services are created)
-        try:
-            from pos import create_invoice_for_reservation
-            from django.db import transaction
-            
-            with transaction.atomic():
-                # Always create invoice - deposits will be applied as payments, not line items
-                invoice = create_invoice_for_reservation(
-                    reservation, 
-                    include_deposit_as_line_item=False  # Always apply deposits as payments
-                )
-        except Exception as e:
-            # Log the error but don't fail reservation creation
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to create invoice for reservation {reservation.id}: {e}")
-            pass
+        # Auto-create invoice for ALL reservations once the reservation and its services are committed
+        transaction.on_commit(partial(self._sync_invoice, reservation))
         
         # Recompute first-for-guest flag so the earliest reservation is marked true
         try:
-            self._recompute_is_first_for_guest(reservation.guest_id)
+            with transaction.atomic():
+                self._recompute_is_first_for_guest(reservation.guest_id)
         except Exception:
             pass
         
         return reservation
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         services_data = validated_data.pop("reservation_services", None)
         # track original guest before changes
@@ -448,49 +438,24 @@ class ReservationSerializer(serializers.ModelSerializer):
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        self._lock_location(instance.location_id)
+        # Pure data edits write only the submitted columns (plus end_time, which save() derives);
+        # status changes write the full row so the timestamps set by the pre_save signal persist
+        update_fields = None if 'status' in validated_data else list({*validated_data, 'end_time'})
         try:
-            instance.save()
+            instance.save(update_fields=update_fields)
         except DjangoValidationError as e:
             detail = getattr(e, 'message_dict', None) or {'detail': e.messages if hasattr(e, 'messages') else str(e)}
             raise serializers.ValidationError(detail)
+        except IntegrityError as e:
+            raise self._integrity_error_detail(e)
         except Exception as e:
             raise serializers.ValidationError({'detail': str(e)})
         
-        # Ensure invoice exists for this reservation
-        try:
-            from pos import create_invoice_for_reservation
-            from django.db import transaction
-            
-            # Check if invoice already exists for this reservation
-            existing_invoice = instance.invoices.filter(status__in=['draft', 'issued', 'partial']).first()
-            
-            if not existing_invoice:
-                # Create new invoice - deposits should be applied as payments, not line items
-                with transaction.atomic():
-                    invoice = create_invoice_for_reservation(
-                        instance, 
-                        include_deposit_as_line_item=False  # Always apply deposits as payments
-                    )
-            elif (deposit_required_changed or deposit_amount_changed) and instance.deposit_required and instance.deposit_amount:
-                # Update existing invoice - apply existing deposit as payment instead of adding as line item
-                from pos.models import Deposit
-                
-                # Find existing deposit for this reservation
-                existing_deposit = Deposit.objects.filter(
-                    reservation=instance,
-                    status__in=['pending', 'collected', 'partially_applied']
-                ).first()
-                
-                if existing_deposit and existing_deposit.can_be_applied():
-                    # Apply the deposit as a payment
-                    try:
-                        existing_deposit.apply_to_invoice(existing_invoice)
-                    except Exception as e:
-                        # If deposit application fails, don't fail the reservation update
-                        pass
-        except Exception as e:
-            # Don't fail reservation update if invoice update fails
-            pass
+        # Ensure invoice exists for this reservation once the update (including services) is committed
+        transaction.on_commit(partial(
+            self._sync_invoice, instance, apply_deposit=deposit_required_changed or deposit_amount_changed
+        ))
         
         # If guest or start_time changed, recompute flags for affected guest(s)
         try:
@@ -498,36 +463,115 @@ class ReservationSerializer(serializers.ModelSerializer):
             if original_guest_id and original_guest_id != getattr(instance, 'guest_id', None):
                 affected_guest_ids.add(original_guest_id)
             affected_guest_ids.add(getattr(instance, 'guest_id', None))
-            for gid in list(affected_guest_ids):
-                if gid:
-                    self._recompute_is_first_for_guest(gid)
+            with transaction.atomic():
+                for gid in list(affected_guest_ids):
+                    if gid:
+                        self._recompute_is_first_for_guest(gid)
         except Exception:
             pass
         if services_data is not None:
             instance.reservation_services.all().delete()
-            for srv in services_data:
-                ReservationService.objects.create(reservation=instance, **srv)
+            self._create_services(instance, services_data)
         return instance
 
+    @staticmethod
+    def _sync_invoice(reservation, apply_deposit=False):
+        """Create the reservation's open invoice, or apply its deposit to the existing one.
+
+        Runs from transaction.on_commit, after the reservation transaction (and its room
+        lock) has been released; failures are logged and never affect the reservation.
+        """
+        try:
+            from pos import create_invoice_for_reservation
+            
+            with transaction.atomic():
+                # Check if invoice already exists for this reservation
+                existing_invoice = reservation.invoices.filter(status__in=['draft', 'issued', 'partial']).first()
+                
+                if not existing_invoice:
+                    # Always create invoice - deposits will be applied as payments, not line items
+                    create_invoice_for_reservation(
+                        reservation,
+                        include_deposit_as_line_item=False  # Always apply deposits as payments
+                    )
+                elif apply_deposit and reservation.deposit_required and reservation.deposit_amount:
+                    # Update existing invoice - apply existing deposit as payment instead of adding as line item
+                    from pos.models import Deposit
+                    
+                    # Find existing deposit for this reservation
+                    existing_deposit = Deposit.objects.filter(
+                        reservation=reservation,
+                        status__in=['pending', 'collected', 'partially_applied']
+                    ).first()
+                    
+                    if existing_deposit and existing_deposit.can_be_applied():
+                        existing_deposit.apply_to_invoice(existing_invoice)
+        except Exception as e:
+            # Log the error but don't fail the reservation create/update
+            logger.error(f"Failed to sync invoice for reservation {reservation.id}: {e}")
+
+    @staticmethod
+    def _integrity_error_detail(error):
+        """ValidationError for a failed insert/update, reporting the overlap constraint like Reservation.clean()."""
+        # reservation_no_overlap is the PostgreSQL exclusion constraint from migration 0020
+        if 'reservation_no_overlap' in str(error):
+            return serializers.ValidationError({'__all__': ["This time slot conflicts with an existing reservation"]})
+        return serializers.ValidationError({'detail': str(error)})
+
+    @staticmethod
+    def _lock_location(location_id):
+        """Row-lock the room so concurrent bookings for it run their overlap check one at a time."""
+        if location_id is not None:
+            list(Location.objects.select_for_update().filter(pk=location_id).values_list('pk', flat=True))
+
+    @staticmethod
+    def _create_services(reservation, services_data):
+        """Insert the nested reservation services with a single bulk INSERT."""
+        objs = []
+        for srv in services_data:
+            obj = ReservationService(reservation=reservation, **srv)
+            # bulk_create bypasses ReservationService.save(), so default unit_price the same way here
+            if not obj.unit_price and obj.service_id:
+                obj.unit_price = obj.service.price
+            objs.append(obj)
+        ReservationService.objects.bulk_create(objs, batch_size=500)
+
     @staticmethod
     def _recompute_is_first_for_guest(guest_id: int):
         """Ensure exactly one reservation per guest has is_first_for_guest=True (earliest by start_time)."""
-        from .models import Reservation
-        qs = Reservation.objects.filter(guest_id=guest_id).order_by('start_time', 'id')
-        first_id = None
-        to_update = []
-        for idx, r in enumerate(qs):
-            should_be_first = idx == 0
-            if r.is_first_for_guest != should_be_first:
-                r.is_first_for_guest = should_be_first
-                to_update.append(r)
-            if should_be_first:
-                first_id = r.id
-        if to_update:
-            Reservation.objects.bulk_update(to_update, ['is_first_for_guest'])
-
-
-class HousekeepingTaskSerializer(serializers.ModelSerializer):
+        reservations = Reservation.objects.filter(guest_id=guest_id)
+        first_id = reservations.order_by('start_time', 'id').values_list('pk', flat=True).first()
+        # Both UPDATEs only touch rows whose flag is wrong, so an already-consistent guest writes nothing
+        reservations.filter(is_first_for_guest=True).exclude(pk=first_id).update(is_first_for_guest=False)
+        if first_id is not None:
+            reservations.filter(pk=first_id, is_first_for_guest=False).update(is_first_for_guest=True)
+
+
+class ReservationListSerializer(ReservationSerializer):
+    """Compact reservation rows for dashboards; nested services and lifecycle timestamps stay on retrieve."""
+
+    class Meta(ReservationSerializer.Meta):
+        fields = [
+            "id",
+            "guest_name",
+            "location_name",
+            "start_time",
+            "end_time",
+            "status",
+            "total_duration_minutes",
+            "total_price",
+        ]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Only the columns rendered above, so the joined guest/location rows stay narrow too
+        return cls._annotate_totals(queryset).select_related('guest', 'location').only(
+            'id', 'start_time', 'end_time', 'status',
+            'guest__first_name', 'guest__last_name', 'location__name',
+        )
+
+
+class HousekeepingTaskSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
     reservation_id = serializers.IntegerField(source='reservation.id', read_only=True)
 
@@ -541,7 +585,16 @@ class HousekeepingTaskSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'started_at', 'completed_at', 'cancelled_at']
 
 
-class HistoricalReservationSerializer(serializers.ModelSerializer):
+class HistoricalReservationListSerializer(serializers.ListSerializer):
+    """Load the related rows of all snapshots together instead of once per snapshot."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prefetch_related_objects(items, 'history_user', 'guest', 'location', 'employee__user')
+        return super().to_representation(items)
+
+
+class HistoricalReservationSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Serializer for django-simple-history snapshots of Reservation."""
     history_id = serializers.IntegerField(read_only=True)
     history_date = serializers.DateTimeField(read_only=True)
@@ -553,8 +606,8 @@ class HistoricalReservationSerializer(serializers.ModelSerializer):
 
     class Meta:
         # Historical model is generated by django-simple-history
-        from .models import HistoricalReservation  # local import to avoid circulars at import time
-        model = HistoricalReservation
+        model = Reservation.history.model
+        list_serializer_class = HistoricalReservationListSerializer
         fields = [
             'id', 'guest', 'guest_name', 'location', 'location_name', 'employee', 'employee_name',
             'start_time', 'end_time', 'status', 'notes',
@@ -571,6 +624,7 @@ class HistoricalReservationSerializer(serializers.ModelSerializer):
                 last = getattr(employee.user, 'last_name', '') or ''
                 full = f"{first} {last}".strip()
                 return full or None
-        except Exception:
+        except ObjectDoesNotExist:
+            # Snapshots can reference an employee that has since been deleted
             pass
         return None
\ No newline at end of file
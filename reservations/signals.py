@@ -1,19 +1,41 @@
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 
-from .models import Reservation, mark_guest_checked_out, mark_guest_in_house, HousekeepingTask
+from healthclub.groups import front_office_group
 
+from .models import Location, Reservation, mark_guest_checked_out, mark_guest_in_house, HousekeepingTask
 
-@receiver(pre_save, sender=Reservation)
+
+def _set_location_flags(location, **flags):
+    """Set the given room flags, writing only those that actually change (e.g. check-in then in-service)."""
+    # Compare against the stored row: the instance loaded with the reservation can be stale,
+    # e.g. after another reservation's checkout freed the room
+    current = Location.objects.filter(pk=location.pk).values(*flags).first()
+    if current is None:
+        return
+    changed = [name for name, value in flags.items() if current[name] != value]
+    for name, value in flags.items():
+        setattr(location, name, value)
+    if changed:
+        # save() rather than update() so the location history records the change
+        location.save(update_fields=changed)
+
+
+@receiver(pre_save, sender=Reservation, dispatch_uid="reservations.handle_checkin_checkout")
 def handle_checkin_checkout(sender, instance: Reservation, **kwargs):
     if not instance.pk:
         return
-    try:
-        previous = Reservation.objects.get(pk=instance.pk)
-    except Reservation.DoesNotExist:
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'status' not in update_fields:
         return
+    # Status as loaded from the database (see Reservation.from_db); only query when it is unknown
+    previous_status = getattr(instance, '_loaded_status', None)
+    if previous_status is None:
+        previous_status = Reservation.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+        if previous_status is None:
+            return
 
-    if previous.status != instance.status:
+    if previous_status != instance.status:
         from django.utils import timezone
         now = timezone.now()
         if instance.status == Reservation.STATUS_CHECKED_IN:
@@ -22,8 +44,7 @@ def handle_checkin_checkout(sender, instance: Reservation, **kwargs):
             # Mark location as occupied when guest checks in
             if getattr(instance, 'location_id', None):
                 try:
-                    instance.location.is_occupied = True
-                    instance.location.save(update_fields=["is_occupied"])
+                    _set_location_flags(instance.location, is_occupied=True)
                 except Exception:
                     pass
         elif instance.status == Reservation.STATUS_IN_SERVICE:
@@ -31,8 +52,7 @@ def handle_checkin_checkout(sender, instance: Reservation, **kwargs):
             # Ensure location is marked occupied during service
             if getattr(instance, 'location_id', None):
                 try:
-                    instance.location.is_occupied = True
-                    instance.location.save(update_fields=["is_occupied"])
+                    _set_location_flags(instance.location, is_occupied=True)
                 except Exception:
                     pass
         elif instance.status == Reservation.STATUS_COMPLETED:
@@ -51,9 +71,7 @@ def handle_checkin_checkout(sender, instance: Reservation, **kwargs):
             # Free up the location and mark as dirty after checkout
             if getattr(instance, 'location_id', None):
                 try:
-                    instance.location.is_occupied = False
-                    instance.location.is_clean = False
-                    instance.location.save(update_fields=["is_occupied", "is_clean"])
+                    _set_location_flags(instance.location, is_occupied=False, is_clean=False)
                     # Create housekeeping task automatically
                     HousekeepingTask.objects.create(location=instance.location, reservation=instance)
                 except Exception:
@@ -86,18 +104,14 @@ def handle_checkin_checkout(sender, instance: Reservation, **kwargs):
             pass
 
 
-@receiver(post_save, sender=Reservation)
+@receiver(post_save, sender=Reservation, dispatch_uid="reservations.grant_group_view_on_reservation")
 def grant_group_view_on_reservation(sender, instance: Reservation, created, **kwargs):
     if not created:
         return
-    import os
-    from django.contrib.auth.models import Group
     from guardian.shortcuts import assign_perm
 
-    group_name = os.environ.get('FRONT_OFFICE_GROUP_NAME', 'Front Office')
-    try:
-        group = Group.objects.get(name=group_name)
-    except Group.DoesNotExist:
+    group = front_office_group()
+    if group is None:
         return
     assign_perm('reservations.view_reservation', group, instance)
 
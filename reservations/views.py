@@ -1,20 +1,69 @@
-from rest_framework import viewsets, decorators, response, status, filters
+import logging
+from datetime import datetime, timedelta
+
+from rest_framework import viewsets, decorators, response, status, filters, renderers
 from django_filters.rest_framework import DjangoFilterBackend
+from django.contrib.auth import get_user_model
+from guardian.shortcuts import assign_perm, get_objects_for_user, get_users_with_perms, remove_perm
 from .models import Location, Reservation, ReservationService, HousekeepingTask
-from .serializers import LocationSerializer, ReservationSerializer, HousekeepingTaskSerializer
+from .serializers import LocationSerializer, ReservationSerializer, ReservationListSerializer, HousekeepingTaskSerializer
 from pos import create_invoice_for_reservation
 from healthclub.permissions import ObjectPermissionsOrReadOnly
+from healthclub.renderers import OrjsonRenderer
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Q
 from django.db.models import F
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper
 from django.db.models import OuterRef, Subquery
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from decimal import Decimal
+from employees.models import EmployeeWeeklySchedule
+from services.models import Service
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def _resolve_user(username):
+    """Return the user with this username, or None; guardian only needs its key."""
+    try:
+        return User.objects.only('id', 'username').get(username=username)
+    except User.DoesNotExist:
+        return None
+
+
+def _parse_iso_datetime(value):
+    """datetime.fromisoformat, retrying with the trailing "Z" that Python < 3.11 rejects spelled as +00:00."""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class GuardianPermsMixin:
+    """Object-permission visibility and the ``permissions`` action shared by the viewsets below."""
+    view_perm = None
+
+    def _filter_visible(self, qs):
+        """Restrict non-staff users to the objects they hold ``view_perm`` on."""
+        user = self.request.user
+        if user.is_staff or user.is_superuser:
+            return qs
+        return get_objects_for_user(user, self.view_perm, qs)
+
+    @decorators.action(detail=True, methods=["get"], url_path="permissions")
+    def permissions(self, request, pk=None):
+        obj = self.get_object()
+        users = get_users_with_perms(obj, attach_perms=True, with_superusers=False)
+        result = {u.username: perms for u, perms in users.items()}
+        return response.Response(result)
+
 
-class LocationViewSet(viewsets.ModelViewSet):
-    queryset = Location.objects.all().order_by("name")
+class LocationViewSet(GuardianPermsMixin, viewsets.ModelViewSet):
+    queryset = Location.objects.all().select_related("type", "status").order_by("name")
+    view_perm = 'reservations.view_location'
     serializer_class = LocationSerializer
     permission_classes = [ObjectPermissionsOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -32,20 +81,7 @@ class LocationViewSet(viewsets.ModelViewSet):
     }
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        user = self.request.user
-        if user.is_staff or user.is_superuser:
-            return qs
-        from guardian.shortcuts import get_objects_for_user
-        return get_objects_for_user(user, 'reservations.view_location', qs)
-
-    @decorators.action(detail=True, methods=["get"], url_path="permissions")
-    def permissions(self, request, pk=None):
-        obj = self.get_object()
-        from guardian.shortcuts import get_users_with_perms
-        users = get_users_with_perms(obj, attach_perms=True, with_superusers=False)
-        result = {u.username: perms for u, perms in users.items()}
-        return response.Response(result)
+        return self._filter_visible(super().get_queryset())
 
     @decorators.action(detail=True, methods=["post"], url_path="mark-clean")
     def mark_clean(self, request, pk=None):
@@ -109,7 +145,6 @@ class HousekeepingTaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         if task.status not in [HousekeepingTask.STATUS_PENDING, HousekeepingTask.STATUS_CANCELLED]:
             return response.Response({"error": "Task already started or completed"}, status=status.HTTP_400_BAD_REQUEST)
-        from django.utils import timezone
         task.status = HousekeepingTask.STATUS_IN_PROGRESS
         task.started_at = timezone.now()
         task.save(update_fields=["status", "started_at"])
@@ -120,7 +155,6 @@ class HousekeepingTaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         if task.status == HousekeepingTask.STATUS_COMPLETED:
             return response.Response({"error": "Task already completed"}, status=status.HTTP_400_BAD_REQUEST)
-        from django.utils import timezone
         task.status = HousekeepingTask.STATUS_COMPLETED
         task.completed_at = timezone.now()
         task.save(update_fields=["status", "completed_at"])
@@ -134,12 +168,10 @@ class HousekeepingTaskViewSet(viewsets.ModelViewSet):
 
     @decorators.action(detail=False, methods=["get"], url_path="analytics")
     def analytics(self, request):
-        from django.db.models import Count, Avg, DurationField, ExpressionWrapper, F
         qs = self.get_queryset()
         counts = qs.values('status').annotate(count=Count('id'))
         # average completion time (completed_at - created_at)
         completed = qs.filter(status=HousekeepingTask.STATUS_COMPLETED, completed_at__isnull=False)
-        from django.db.models.functions import Now
         duration_expr = ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
         avg_duration = completed.aggregate(avg=Avg(duration_expr)).get('avg')
         return response.Response({
@@ -152,7 +184,6 @@ class HousekeepingTaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         if task.status == HousekeepingTask.STATUS_COMPLETED:
             return response.Response({"error": "Cannot cancel a completed task"}, status=status.HTTP_400_BAD_REQUEST)
-        from django.utils import timezone
         task.status = HousekeepingTask.STATUS_CANCELLED
         task.cancelled_at = timezone.now()
         
@@ -191,16 +222,12 @@ class HousekeepingTaskViewSet(viewsets.ModelViewSet):
         return response.Response({"id": obj.id, "is_out_of_service": obj.is_out_of_service})
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
-    queryset = Reservation.objects.all().select_related(
-        "guest", 
-        "location"
-    ).prefetch_related(
-        "reservation_services__service__category",
-        "employee_assignments__employee__user"
-    ).order_by("-start_time")
+class ReservationViewSet(GuardianPermsMixin, viewsets.ModelViewSet):
+    view_perm = 'reservations.view_reservation'
+    queryset = Reservation.objects.all().order_by("-start_time")
     serializer_class = ReservationSerializer
     permission_classes = [ObjectPermissionsOrReadOnly]
+    renderer_classes = [OrjsonRenderer, renderers.BrowsableAPIRenderer]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["guest__first_name", "guest__last_name", "notes"]
     ordering_fields = ["start_time", "end_time"]
@@ -215,8 +242,10 @@ class ReservationViewSet(viewsets.ModelViewSet):
 
     @decorators.action(detail=False, methods=["get"], url_path="report-utilization")
     def report_utilization(self, request):
-        from django.db.models import Count
-        data = self.get_queryset().values('location__name').annotate(bookings=Count('id')).order_by('-bookings')
+        # Aggregate over the bare table; the serializer's annotations would only add joins to the GROUP BY
+        data = self._filter_visible(Reservation.objects.all()).values('location__name').annotate(
+            bookings=Count('id')
+        ).order_by('-bookings')
         return response.Response(list(data))
 
     @decorators.action(detail=True, methods=["post"], url_path="check-in")
@@ -430,21 +459,20 @@ class ReservationViewSet(viewsets.ModelViewSet):
     def get_services(self, request, pk=None):
         """Get detailed service information for a reservation"""
         reservation = self.get_object()
-        services = []
-        for rs in reservation.reservation_services.all():
-            services.append({
-                'id': rs.id,
-                'service_id': rs.service.id,
-                'service_name': rs.service.name,
-                'service_description': rs.service.description,
-                'service_duration_minutes': rs.service.duration_minutes,
-                'service_price': rs.service.price,
-                'service_category': rs.service.category.name if rs.service.category else None,
-                'quantity': rs.quantity,
-                'unit_price': rs.unit_price,
-                'total_price': rs.total_price,
-            })
-        return response.Response(services)
+        # One joined query straight into dicts; no ReservationService/Service instances are built
+        services = ReservationService.objects.filter(reservation=reservation).order_by('pk').values(
+            'id',
+            'service_id',
+            'quantity',
+            'unit_price',
+            'total_price',
+            service_name=F('service__name'),
+            service_description=F('service__description'),
+            service_duration_minutes=F('service__duration_minutes'),
+            service_price=F('service__price'),
+            service_category=F('service__category__name'),
+        )
+        return response.Response(list(services))
 
     @decorators.action(detail=True, methods=["post"], url_path="add-service")
     def add_service(self, request, pk=None):
@@ -460,29 +488,31 @@ class ReservationViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            from services.models import Service
-            service = Service.objects.get(id=service_id)
-            
-            # Check if service already exists in reservation
-            existing_service = reservation.reservation_services.filter(service=service).first()
-            if existing_service:
-                existing_service.quantity += quantity
-                existing_service.save()
-                return response.Response({"message": "Service quantity updated"})
-            else:
-                ReservationService.objects.create(
-                    reservation=reservation,
-                    service=service,
-                    quantity=quantity
-                )
-                return response.Response({"message": "Service added to reservation"})
-                
+            # price is the only column ReservationService.save() reads (unit_price default)
+            service = Service.objects.only('pk', 'price').get(id=service_id)
         except Service.DoesNotExist:
             return response.Response(
                 {"error": "Service not found"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # Bump an existing line in one UPDATE; insert only when the reservation has none yet
+        existing = reservation.reservation_services.filter(service=service)
+        if existing.update(quantity=F('quantity') + quantity):
+            return response.Response({"message": "Service quantity updated"})
+        try:
+            with transaction.atomic():
+                ReservationService.objects.create(
+                    reservation=reservation,
+                    service=service,
+                    quantity=quantity
+                )
+        except IntegrityError:
+            # A concurrent request added the line first; unique (reservation, service) keeps it to one row
+            existing.update(quantity=F('quantity') + quantity)
+            return response.Response({"message": "Service quantity updated"})
+        return response.Response({"message": "Service added to reservation"})
+
     @decorators.action(detail=True, methods=["post"], url_path="cancel")
     def cancel(self, request, pk=None):
         reservation = self.get_object()
@@ -948,55 +978,55 @@ class ReservationViewSet(viewsets.ModelViewSet):
             'reservation_status': reservation.status
         })
 
+    def get_serializer_class(self):
+        # The compact list is opt-in; existing clients rely on the full nested rows
+        if self.action == 'list' and self.request.query_params.get('compact') in ('1', 'true'):
+            return ReservationListSerializer
+        return ReservationSerializer
+
+    # Actions that reply with a few fields of their own and never render the serializer
+    lean_actions = {'check_in', 'in_service', 'complete', 'cancel', 'get_services'}
+
     def get_queryset(self):
-        qs = super().get_queryset()
-        user = self.request.user
-        if user.is_staff or user.is_superuser:
-            return qs
-        from guardian.shortcuts import get_objects_for_user
+        if self.action in self.lean_actions:
+            # Only the guest and room the pre_save status handler touches
+            qs = super().get_queryset().select_related('guest', 'location')
+        else:
+            # The serializer joins, prefetches and annotates the columns it renders
+            qs = self.get_serializer_class().setup_eager_loading(super().get_queryset())
+        return self._filter_visible(qs)
 
-        return get_objects_for_user(user, 'reservations.view_reservation', qs)
+    def perform_create(self, serializer):
+        serializer.save()
+        self._reload_for_response(serializer)
 
-    @decorators.action(detail=True, methods=["get"], url_path="permissions")
-    def permissions(self, request, pk=None):
-        obj = self.get_object()
-        from guardian.shortcuts import get_users_with_perms
+    def perform_update(self, serializer):
+        serializer.save()
+        self._reload_for_response(serializer)
 
-        users = get_users_with_perms(obj, attach_perms=True, with_superusers=False)
-        result = {u.username: perms for u, perms in users.items()}
-        return response.Response(result)
+    def _reload_for_response(self, serializer):
+        """Re-read the saved reservation with the serializer's annotations so the response matches retrieve."""
+        qs = serializer.setup_eager_loading(Reservation.objects.all())
+        serializer.instance = qs.get(pk=serializer.instance.pk)
 
     @decorators.action(detail=True, methods=["post"], url_path="grant", permission_classes=[ObjectPermissionsOrReadOnly])
     def grant(self, request, pk=None):
-        reservation = self.get_object()
-        from guardian.shortcuts import assign_perm
-        username = request.data.get("username")
-        perm = request.data.get("perm", "change_reservation")
-        from django.contrib.auth import get_user_model
-
-        User = get_user_model()
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            return response.Response({"detail": "User not found"}, status=status.HTTP_400_BAD_REQUEST)
-        assign_perm(perm, user, reservation)
-        return response.Response({"granted": perm, "to": username})
+        return self._change_user_perm(request, assign_perm, "granted", "to")
 
     @decorators.action(detail=True, methods=["post"], url_path="revoke", permission_classes=[ObjectPermissionsOrReadOnly])
     def revoke(self, request, pk=None):
+        return self._change_user_perm(request, remove_perm, "revoked", "from")
+
+    def _change_user_perm(self, request, apply_perm, verb, preposition):
+        """Shared body of grant/revoke: apply ``perm`` (default change_reservation) for ``username``."""
         reservation = self.get_object()
-        from guardian.shortcuts import remove_perm
         username = request.data.get("username")
         perm = request.data.get("perm", "change_reservation")
-        from django.contrib.auth import get_user_model
-
-        User = get_user_model()
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
+        user = _resolve_user(username)
+        if user is None:
             return response.Response({"detail": "User not found"}, status=status.HTTP_400_BAD_REQUEST)
-        remove_perm(perm, user, reservation)
-        return response.Response({"revoked": perm, "from": username})
+        apply_perm(perm, user, reservation)
+        return response.Response({verb: perm, preposition: username})
     
     @decorators.action(detail=True, methods=["post"], url_path="mark-clean")
     def mark_clean(self, request, pk=None):
@@ -1033,33 +1063,28 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # TODO: add your service duration lookup
-        from services.models import Service
+        # Only the keys and durations are needed, not full Service rows
         try:
             if services_param:
-                services_qs = Service.objects.filter(pk__in=services_param)
-                services = list(services_qs)
-                if not services:
+                durations = dict(Service.objects.filter(pk__in=services_param).values_list('pk', 'duration_minutes'))
+                if not durations:
                     return response.Response({"error": "Services not found"}, status=status.HTTP_404_NOT_FOUND)
+                service_ids = list(durations)
                 # use max duration among selected services
-                duration_minutes = max([s.duration_minutes for s in services] or [60])
+                duration_minutes = max(durations.values())
             else:
-                service = Service.objects.get(pk=service_id)
-                services = [service]
-                duration_minutes = service.duration_minutes
+                duration_minutes = Service.objects.values_list('duration_minutes', flat=True).get(pk=service_id)
+                service_ids = [service_id]
         except Service.DoesNotExist:
             return response.Response({"error": "Service not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # calculate end time
-        from datetime import timedelta
-        start_dt = timezone.datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+        start_dt = _parse_iso_datetime(start_time)
         end_dt = start_dt + timedelta(minutes=duration_minutes)
 
         # Check employee schedule availability first
         if employee_id:
             try:
-                from employees.models import EmployeeWeeklySchedule
-                from datetime import datetime
                 
                 # Get the day of week for the start time
                 start_date = start_dt.date()
@@ -1099,20 +1124,10 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 
             except Exception as e:
                 # If schedule check fails, log but don't block reservation
-                import logging
-                logger = logging.getLogger(__name__)
                 logger.warning(f"Failed to check employee schedule: {e}")
 
-        # check conflicts
-        conflicts = Reservation.objects.filter(
-            start_time__lt=end_dt,
-            end_time__gt=start_dt,
-            status__in=[
-                Reservation.STATUS_BOOKED,
-                Reservation.STATUS_CHECKED_IN,
-                Reservation.STATUS_IN_SERVICE,
-            ],
-        )
+        # check conflicts (same overlap rule as Reservation.clean())
+        conflicts = Reservation.objects.filter(Reservation.overlap_q(start_dt, end_dt))
 
         if employee_id:
             # Filter by the reservation's employee (no employee on ReservationService)
@@ -1140,7 +1155,10 @@ class ReservationViewSet(viewsets.ModelViewSet):
 
             # service compatibility: service must be allowed in location
             try:
-                compat_all = all([s.locations.filter(pk=loc.pk).exists() for s in services])
+                # One anti-join instead of a locations query per service
+                compat_all = not Service.objects.filter(
+                    pk__in=service_ids
+                ).exclude(locations=loc).exists()
             except Exception:
                 compat_all = False
             if not compat_all:
@@ -1173,19 +1191,11 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        start_dt = timezone.datetime.fromisoformat(start_time.replace("Z", "+00:00"))
-        end_dt = timezone.datetime.fromisoformat(end_time.replace("Z", "+00:00"))
-
-        conflicts = Reservation.objects.filter(
-            location_id=location_id,
-            start_time__lt=end_dt,
-            end_time__gt=start_dt,
-            status__in=[
-                Reservation.STATUS_BOOKED,
-                Reservation.STATUS_CHECKED_IN,
-                Reservation.STATUS_IN_SERVICE,
-            ],
-        )
+        start_dt = _parse_iso_datetime(start_time)
+        end_dt = _parse_iso_datetime(end_time)
+
+        # Served by res_loc_status_start_idx (location, status, start_time)
+        conflicts = Reservation.objects.filter(Reservation.overlap_q(start_dt, end_dt), location_id=location_id)
         if exclude_reservation:
             try:
                 conflicts = conflicts.exclude(pk=int(exclude_reservation))
@@ -1203,10 +1213,8 @@ class ReservationViewSet(viewsets.ModelViewSet):
 
         # service compatibility: all services must be allowed in location
         try:
-            from services.models import Service
             if services_list and isinstance(services_list, list):
-                svcs = Service.objects.filter(pk__in=services_list)
-                if not all([s.locations.filter(pk=loc.pk).exists() for s in svcs]):
+                if Service.objects.filter(pk__in=services_list).exclude(locations=loc).exists():
                     return response.Response({"conflict": True, "reason": "incompatible_room"})
             elif service_id:
                 svc = Service.objects.get(pk=int(service_id))